@@ -4,13 +4,26 @@ import os
 from dataclasses import dataclass
 from typing import Final, Optional
 
-from dotenv import dotenv_values
+from dotenv import load_dotenv
 
 
 _DOTENV_PATH: Final[str] = ".env"
 
+_LOADED: bool = False
 
-@dataclass(frozen=True)
+
+def _load_dotenv_once() -> None:
+    """Merge `.env` into `os.environ` once; real environment variables win."""
+    global _LOADED
+    if not _LOADED:
+        load_dotenv(_DOTENV_PATH, override=False)
+        _LOADED = True
+
+
+_load_dotenv_once()
+
+
+@dataclass(frozen=True, slots=True)
 class Settings:
     """Application configuration loaded from environment variables.
 
@@ -21,17 +34,15 @@ class Settings:
     database_url: str
     environment: str
     gemini_model_name: str
+    checkpoint_db_path: str
+    graph_mode: str
 
 
 def _load_from_env() -> Settings:
     """Load configuration from `.env` and OS environment variables."""
-    dotenv_config = dotenv_values(_DOTENV_PATH)
 
     def _get(name: str, default: Optional[str] = None) -> Optional[str]:
-        value = os.getenv(name)
-        if value is not None:
-            return value
-        return dotenv_config.get(name) or default
+        return os.environ.get(name, default)
 
     google_api_key = _get("GOOGLE_API_KEY")
     if not google_api_key:
@@ -47,21 +58,37 @@ def _load_from_env() -> Settings:
 
     gemini_model_name = _get("GEMINI_MODEL_NAME", "gemini-2.5-flash") or "gemini-2.5-flash"
 
+    # LangGraph checkpoints live in their own SQLite file so paused threads
+    # survive restarts and are visible to every worker process.
+    checkpoint_db_path = _get("CHECKPOINT_DB_PATH", "checkpoints.db") or "checkpoints.db"
+
+    # "fused" drafts with a single LLM call; "staged" runs analyze, strategy
+    # and draft as separate nodes, which is easier to debug.
+    graph_mode = _get("GRAPH_MODE", "fused") or "fused"
+    if graph_mode not in ("fused", "staged"):
+        raise RuntimeError(
+            f"GRAPH_MODE must be 'fused' or 'staged', got {graph_mode!r}.",
+        )
+
     return Settings(
         google_api_key=google_api_key,
         database_url=database_url,
         environment=environment,
         gemini_model_name=gemini_model_name,
+        checkpoint_db_path=checkpoint_db_path,
+        graph_mode=graph_mode,
     )
 
 
-_SETTINGS: Optional[Settings] = None
+# Loaded eagerly at import: `.env` parsing and validation happen exactly once,
+# the first request pays nothing, and concurrent threads never race to
+# initialise settings. Import this directly (`from config import settings`).
+settings: Final[Settings] = _load_from_env()
 
 
 def get_settings() -> Settings:
-    """Return a cached instance of loaded application settings."""
-    global _SETTINGS
-    if _SETTINGS is None:
-        _SETTINGS = _load_from_env()
-    return _SETTINGS
+    """Return the loaded application settings.
 
+    Kept for backwards compatibility; prefer importing `settings`.
+    """
+    return settings
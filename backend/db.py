@@ -1,29 +1,53 @@
 from __future__ import annotations
 
 from collections.abc import Iterator
+from typing import Any
 
+from sqlalchemy import event
 from sqlmodel import Session, SQLModel, create_engine
 
-from config import get_settings
+import models  # noqa: F401  # Register table models with SQLModel metadata.
+from config import settings
 
 
-settings = get_settings()
-
 # For SQLite, `check_same_thread=False` allows usage across threads in FastAPI.
 connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
 
 engine = create_engine(settings.database_url, echo=False, connect_args=connect_args)
 
 
+if settings.database_url.startswith("sqlite"):
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection: Any, _connection_record: Any) -> None:
+        """Tune each new SQLite connection for concurrent webhook writes.
+
+        WAL lets readers proceed while a write is in flight, and
+        `synchronous=NORMAL` avoids an fsync on every commit (still durable
+        across application crashes in WAL mode).
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+
+_DB_INITED: bool = False
+
+
 def init_db() -> None:
     """Create database tables if they do not exist.
 
-    This is intended to be called once at application startup.
+    This is intended to be called once at application startup; repeat calls
+    are no-ops.
     """
-    import models  # Import models so SQLModel is aware of them.
-
-    _ = models  # Avoid unused import warnings.
+    global _DB_INITED
+    if _DB_INITED:
+        return
     SQLModel.metadata.create_all(engine)
+    _DB_INITED = True
 
 
 def get_session() -> Iterator[Session]:
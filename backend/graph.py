@@ -1,18 +1,80 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict, TypedDict, cast
+import re
+from typing import Any, AsyncContextManager, Dict, Optional, Tuple, TypedDict, TypeVar, cast
 
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.graph import StateGraph
+from pydantic import ValidationError
 
-from config import get_settings
-from schemas import NegotiationState
+from config import settings
+from schemas import AnalyzePayload, FusedPayload, NegotiationState
 from tools import MarketRate, calculate_counter_offer, lookup_market_rates
 
 
+_PayloadT = TypeVar("_PayloadT", bound=AnalyzePayload)
+
+
+# Prompts are immutable, so they are built once and shared by every call.
+_ANALYZE_SYSTEM = SystemMessage(
+    content=(
+        "You are an assistant that extracts structured data from vendor SaaS pricing emails. "
+        "Return a JSON object with keys: vendor_name, product_name, current_offer, sender_name, recipient_name. "
+        "current_offer should be a numeric price per seat per month. "
+        "If a value is missing or cannot be confidently determined, use null."
+    ),
+)
+
+_DRAFT_INSTRUCTION = SystemMessage(
+    content=(
+        "You are a procurement negotiation assistant drafting concise, polite emails. "
+        "Draft a single email response to a vendor about SaaS pricing, using the structured "
+        "fields below.\n\n"
+        "If Decision is \"counter\" and a numeric target price is provided:\n"
+        "- Propose that target price as a clear counter-offer (for example: "
+        "\"we would be comfortable proceeding at $X per seat per month\").\n"
+        "- Use the target price value exactly as provided in the context.\n"
+        "- Avoid vague language like \"more competitive\" without stating a concrete price.\n\n"
+        "If Decision is \"accept\":\n"
+        "- Clearly confirm acceptance of the vendor's quoted price.\n\n"
+        "If Decision is \"reject\" and no target price is available:\n"
+        "- Politely say we cannot proceed at the current pricing and invite the vendor "
+        "to return with a more competitive offer.\n\n"
+        "When names are provided, use a natural greeting (for example, "
+        "\"Dear {sender_name}\" or \"Dear {vendor_name} team\") and a "
+        "polite sign-off that can optionally include the recipient_name.\n\n"
+        "Do not mention that you are an AI system. "
+        "Write the email body only, without subject line."
+    ),
+)
+
+_TARGET_PRICE_PLACEHOLDER = "{TARGET_PRICE}"
+
+_FUSED_SYSTEM = SystemMessage(
+    content=(
+        "You are a procurement negotiation assistant handling vendor SaaS pricing emails. "
+        "Extract vendor_name, product_name, current_offer, sender_name and recipient_name. "
+        "current_offer should be a numeric price per seat per month; use null for any value "
+        "that is missing or cannot be confidently determined.\n\n"
+        "Set decision_hint to \"reject\" if no product or numeric per-seat price is stated, "
+        "otherwise \"counter\".\n\n"
+        "Then write draft_email, a concise and polite reply to the vendor:\n"
+        "- For \"counter\", propose our price as a clear counter-offer (for example: "
+        f"\"we would be comfortable proceeding at ${_TARGET_PRICE_PLACEHOLDER} per seat per month\"). "
+        f"Write the literal text {_TARGET_PRICE_PLACEHOLDER} where the price goes; it is filled in later.\n"
+        "- For \"reject\", politely say we cannot proceed at the current pricing and invite the "
+        "vendor to return with a more competitive offer.\n"
+        "When names are known, use a natural greeting and a polite sign-off that can optionally "
+        "include the recipient_name. Do not mention that you are an AI system. "
+        "Write the email body only, without subject line."
+    ),
+)
+
+
 class GraphConfig(TypedDict):
     """Graph configuration passed via LangGraph's `config` parameter."""
 
@@ -21,7 +83,6 @@ class GraphConfig(TypedDict):
 
 def _init_model() -> ChatGoogleGenerativeAI:
     """Initialise the Gemini chat model using application settings."""
-    settings = get_settings()
     return ChatGoogleGenerativeAI(
         model=settings.gemini_model_name,
         temperature=0.3,
@@ -32,7 +93,67 @@ def _init_model() -> ChatGoogleGenerativeAI:
 MODEL = _init_model()
 
 
-def analyze_node(state: NegotiationState) -> NegotiationState:
+_FENCE_RE = re.compile(r"^```(?:\w+)?\s*(.*?)\s*```\s*$", re.DOTALL)
+"""Matches a reply wrapped in a Markdown code fence, capturing the body."""
+
+
+def _parse_structured_payload(raw: Any) -> Dict[str, Any]:
+    """Parse a raw model response into a JSON dict.
+
+    Structured output normally handles extraction; this is the last-resort
+    fallback when Gemini ignores the schema and wraps JSON in code fences or
+    adds prose around it.
+    """
+    if not isinstance(raw, str):
+        return {}
+
+    text = raw.strip()
+
+    # Handle common ```json ... ``` wrapping in a single regex pass. An
+    # unterminated fence falls through to the brace search below.
+    fence_match = _FENCE_RE.match(text)
+    if fence_match is not None:
+        text = fence_match.group(1)
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # Fallback: try to locate the first JSON object within the text.
+        start_index = text.find("{")
+        end_index = text.rfind("}")
+        if start_index != -1 and end_index > start_index:
+            try:
+                return json.loads(text[start_index : end_index + 1])
+            except json.JSONDecodeError:
+                return {}
+        return {}
+
+
+def _payload_from_raw(raw: Any, schema: type[_PayloadT]) -> _PayloadT:
+    """Build a `schema` instance from an unstructured model reply."""
+    parsed = _parse_structured_payload(raw)
+    if not isinstance(parsed, dict):
+        return schema()
+    try:
+        return schema.model_validate(parsed)
+    except ValidationError as exc:
+        # Drop only the offending keys (e.g. `current_offer: "$49/seat"`) so
+        # the remaining valid fields still make it into the state.
+        invalid_keys = {error["loc"][0] for error in exc.errors() if error["loc"]}
+        cleaned = {key: value for key, value in parsed.items() if key not in invalid_keys}
+        try:
+            return schema.model_validate(cleaned)
+        except ValidationError:
+            return schema()
+
+
+# Gemini constrains decoding to the `AnalyzePayload` schema. `include_raw`
+# keeps the original message around so we can still repair the rare reply
+# that fails to parse instead of raising.
+ANALYZE_MODEL = MODEL.with_structured_output(AnalyzePayload, include_raw=True)
+
+
+async def analyze_node(state: NegotiationState) -> NegotiationState:
     """Node 1: Analyze the incoming email to extract core fields.
 
     Uses Gemini to extract:
@@ -42,92 +163,35 @@ def analyze_node(state: NegotiationState) -> NegotiationState:
     - sender_name (human contact at the vendor, e.g. "Bob")
     - recipient_name (our contact name, e.g. "JJ")
     """
-    messages = state.get("messages", [])
-
-    system = SystemMessage(
-        content=(
-            "You are an assistant that extracts structured data from vendor SaaS pricing emails. "
-            "Return a JSON object with keys: vendor_name, product_name, current_offer, sender_name, recipient_name. "
-            "current_offer should be a numeric price per seat per month. "
-            "If a value is missing or cannot be confidently determined, use null."
-        ),
-    )
-    prompt_messages = [system, *messages]
-
-    response = MODEL.invoke(prompt_messages)
-    content = response.content
-
-    vendor_name = None
-    product_name = None
-    current_offer = None
-    sender_name = None
-    recipient_name = None
-
-    def _parse_structured_payload(raw: Any) -> Dict[str, Any]:
-        """Parse the model's response into a JSON dict.
-
-        Gemini may sometimes wrap JSON in code fences or add prose. This helper
-        makes a best-effort attempt to extract the first JSON object from the
-        string so that fields like `product_name` are reliably captured.
-        """
-        if not isinstance(raw, str):
-            return {}
-
-        text = raw.strip()
-
-        # Handle common ```json ... ``` wrapping.
-        if text.startswith("```"):
-            lines = text.splitlines()
-            # Drop the opening fence (and optional language tag).
-            lines = lines[1:]
-            # Drop a possible closing fence.
-            if lines and lines[-1].strip().startswith("```"):
-                lines = lines[:-1]
-            text = "\n".join(lines).strip()
+    # One list build for the model input; the state list itself is never mutated.
+    prompt_messages = [_ANALYZE_SYSTEM, *state.get("messages", ())]
 
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            # Fallback: try to locate the first JSON object within the text.
-            start_index = text.find("{")
-            end_index = text.rfind("}")
-            if start_index != -1 and end_index > start_index:
-                try:
-                    return json.loads(text[start_index : end_index + 1])
-                except json.JSONDecodeError:
-                    return {}
-            return {}
-
-    parsed = _parse_structured_payload(content)
-    vendor_name = parsed.get("vendor_name")
-    product_name = parsed.get("product_name")
-    sender_name = parsed.get("sender_name")
-    recipient_name = parsed.get("recipient_name")
-    raw_offer = parsed.get("current_offer")
-    if isinstance(raw_offer, (int, float)):
-        current_offer = float(raw_offer)
+    result = await ANALYZE_MODEL.ainvoke(prompt_messages)
+    payload = cast(Optional[AnalyzePayload], result.get("parsed"))
+    if payload is None:
+        payload = _payload_from_raw(result["raw"].content, AnalyzePayload)
 
+    # Nodes return only the keys they change; LangGraph merges the update
+    # into the checkpointed state.
     new_state: NegotiationState = {
-        **state,
-        "vendor_name": vendor_name,
-        "product_name": product_name,
-        "sender_name": sender_name,
-        "recipient_name": recipient_name,
-        "current_offer": current_offer,
+        "vendor_name": payload.vendor_name,
+        "product_name": payload.product_name,
+        "sender_name": payload.sender_name,
+        "recipient_name": payload.recipient_name,
+        "current_offer": payload.current_offer,
         "status": "strategizing",
     }
     return new_state
 
 
-def strategy_node(state: NegotiationState) -> NegotiationState:
-    """Node 2: Devise a negotiation strategy based on market rates.
+def _decide_strategy(
+    product_name: Optional[str],
+    current_offer: Optional[float],
+) -> Tuple[str, Optional[float], Optional[MarketRate]]:
+    """Return `(decision, target_price, market_rate)` for an offer.
 
-    Compares the vendor's current offer to a mocked market rate and
-    decides whether to accept, reject, or counter.
+    Pure Python pricing rules shared by `strategy_node` and `fused_node`.
     """
-    product_name = state.get("product_name")
-    current_offer = state.get("current_offer")
-
     decision = "reject"
     target_price = None
     market_rate: MarketRate | None = None
@@ -146,7 +210,16 @@ def strategy_node(state: NegotiationState) -> NegotiationState:
             decision = "counter"
             target_price = calculate_counter_offer(current_offer, reference_rate)
 
-    decision_message = AIMessage(
+    return decision, target_price, market_rate
+
+
+def _decision_message(
+    decision: str,
+    market_rate: Optional[MarketRate],
+    target_price: Optional[float],
+) -> AIMessage:
+    """Summarise a strategy decision as a message for the conversation log."""
+    return AIMessage(
         content=(
             f"Decision: {decision}. "
             f"Market reference: {market_rate.reference if market_rate else 'unknown'}. "
@@ -154,25 +227,28 @@ def strategy_node(state: NegotiationState) -> NegotiationState:
         ),
     )
 
-    messages = state.get("messages", [])
-    messages.append(decision_message)
+
+def strategy_node(state: NegotiationState) -> NegotiationState:
+    """Node 2: Devise a negotiation strategy based on market rates.
+
+    Compares the vendor's current offer to a mocked market rate and
+    decides whether to accept, reject, or counter.
+    """
+    decision, target_price, market_rate = _decide_strategy(
+        state.get("product_name"),
+        state.get("current_offer"),
+    )
 
     new_state: NegotiationState = {
-        **state,
-        "messages": messages,
+        "messages": [_decision_message(decision, market_rate, target_price)],
         "target_price": target_price,
         "status": "drafting",
     }
     return new_state
 
 
-def draft_node(state: NegotiationState) -> NegotiationState:
-    """Node 3: Draft an email response for human review.
-
-    This node uses the LLM to create a natural-language email response,
-    but it does NOT send the email. Instead, it stores the draft in
-    `draft_response` for a human to approve.
-    """
+async def _generate_draft(state: NegotiationState) -> BaseMessage:
+    """Ask the LLM for a reply email built from the negotiation fields."""
     vendor_name = state.get("vendor_name") or "the vendor"
     product_name = state.get("product_name") or "the SaaS subscription"
     sender_name = state.get("sender_name")
@@ -190,58 +266,109 @@ def draft_node(state: NegotiationState) -> NegotiationState:
     elif current_offer is not None and abs(target_price - current_offer) < 1e-6:
         decision_summary = "accept"
 
-    instruction = SystemMessage(
+    user_message = HumanMessage(
         content=(
-            "You are a procurement negotiation assistant drafting concise, polite emails. "
-            "Draft a single email response to a vendor about SaaS pricing, using the structured "
-            "fields below.\n\n"
-            "If Decision is \"counter\" and a numeric target price is provided:\n"
-            "- Propose that target price as a clear counter-offer (for example: "
-            "\"we would be comfortable proceeding at $X per seat per month\").\n"
-            "- Use the target price value exactly as provided in the context.\n"
-            "- Avoid vague language like \"more competitive\" without stating a concrete price.\n\n"
-            "If Decision is \"accept\":\n"
-            "- Clearly confirm acceptance of the vendor's quoted price.\n\n"
-            "If Decision is \"reject\" and no target price is available:\n"
-            "- Politely say we cannot proceed at the current pricing and invite the vendor "
-            "to return with a more competitive offer.\n\n"
-            "When names are provided, use a natural greeting (for example, "
-            "\"Dear {sender_name}\" or \"Dear {vendor_name} team\") and a "
-            "polite sign-off that can optionally include the recipient_name.\n\n"
-            "Do not mention that you are an AI system. "
+            f"Vendor name: {vendor_name}\n"
+            f"Product: {product_name}\n"
+            f"Sender contact name (vendor): {sender_name or 'unknown'}\n"
+            f"Our contact name (recipient): {recipient_name or 'unknown'}\n"
+            f"Vendor current offer (per seat / month): {current_offer if current_offer is not None else 'unknown'}\n"
+            f"Our target price (per seat / month): {target_price if target_price is not None else 'unknown'}\n"
+            f"Decision: {decision_summary} (accept / reject / counter).\n"
+            "\n"
             "Write the email body only, without subject line."
         ),
     )
 
-    user_prompt_lines = [
-        f"Vendor name: {vendor_name}",
-        f"Product: {product_name}",
-        f"Sender contact name (vendor): {sender_name or 'unknown'}",
-        f"Our contact name (recipient): {recipient_name or 'unknown'}",
-        f"Vendor current offer (per seat / month): {current_offer if current_offer is not None else 'unknown'}",
-        f"Our target price (per seat / month): {target_price if target_price is not None else 'unknown'}",
-        f"Decision: {decision_summary} (accept / reject / counter).",
-        "",
-        "Write the email body only, without subject line.",
-    ]
+    return await MODEL.ainvoke([_DRAFT_INSTRUCTION, user_message])
 
-    user_message = HumanMessage(content="\n".join(user_prompt_lines))
 
-    response = MODEL.invoke([instruction, user_message])
-    draft_email = cast(str, response.content)
+async def draft_node(state: NegotiationState) -> NegotiationState:
+    """Node 3: Draft an email response for human review.
 
-    messages = state.get("messages", [])
-    messages.append(AIMessage(content=draft_email))
+    This node uses the LLM to create a natural-language email response,
+    but it does NOT send the email. Instead, it stores the draft in
+    `draft_response` for a human to approve.
+    """
+    response = await _generate_draft(state)
 
+    # The model reply is already an AIMessage; append it as-is.
     new_state: NegotiationState = {
-        **state,
-        "messages": messages,
-        "draft_response": draft_email,
+        "messages": [response],
+        "draft_response": cast(str, response.content),
         "status": "awaiting_human_review",
     }
     return new_state
 
 
+# Gemini extracts the fields and drafts the reply in one round-trip. The model
+# does not know our market rates, so it writes a placeholder for the counter
+# price that is filled in once the deterministic strategy has run.
+FUSED_MODEL = MODEL.with_structured_output(FusedPayload, include_raw=True)
+
+
+async def fused_node(state: NegotiationState) -> NegotiationState:
+    """Fast path: analyze, strategize and draft with a single LLM call.
+
+    Gemini returns the extracted fields, a guessed decision and a draft
+    email together. The strategy is then computed in Python exactly as in
+    `strategy_node`; the draft is regenerated via the staged drafting
+    prompt when the model's `decision_hint` disagrees with that strategy or
+    the draft cannot carry the computed target price.
+
+    The prompt only lets the model hint "counter" or "reject", because it
+    cannot know our market rates. Every "accept" outcome (offer at or below
+    90% of the reference rate) therefore costs a second LLM call.
+    """
+    prompt_messages = [_FUSED_SYSTEM, *state.get("messages", ())]
+
+    result = await FUSED_MODEL.ainvoke(prompt_messages)
+    payload = cast(Optional[FusedPayload], result.get("parsed"))
+    if payload is None:
+        payload = _payload_from_raw(result["raw"].content, FusedPayload)
+
+    decision, target_price, market_rate = _decide_strategy(
+        payload.product_name,
+        payload.current_offer,
+    )
+
+    new_state: NegotiationState = {
+        "vendor_name": payload.vendor_name,
+        "product_name": payload.product_name,
+        "sender_name": payload.sender_name,
+        "recipient_name": payload.recipient_name,
+        "current_offer": payload.current_offer,
+        "target_price": target_price,
+    }
+
+    # A usable draft must match the computed decision and carry the price
+    # placeholder exactly when there is a target price to fill in; a counter
+    # without a concrete price goes back through the staged drafting prompt.
+    draft_email = payload.draft_email
+    if (
+        not draft_email
+        or payload.decision_hint != decision
+        or (_TARGET_PRICE_PLACEHOLDER in draft_email) != (target_price is not None)
+    ):
+        draft_email = None
+    elif target_price is not None:
+        draft_email = draft_email.replace(_TARGET_PRICE_PLACEHOLDER, f"{target_price:.2f}")
+
+    if draft_email is None:
+        draft_message = await _generate_draft({**state, **new_state})
+        draft_email = cast(str, draft_message.content)
+    else:
+        draft_message = AIMessage(content=draft_email)
+
+    new_state["messages"] = [
+        _decision_message(decision, market_rate, target_price),
+        draft_message,
+    ]
+    new_state["draft_response"] = draft_email
+    new_state["status"] = "awaiting_human_review"
+    return new_state
+
+
 def human_review_node(state: NegotiationState) -> NegotiationState:
     """Node 4: Human review placeholder.
 
@@ -251,31 +378,49 @@ def human_review_node(state: NegotiationState) -> NegotiationState:
 
     With `interrupt_before=["human_review"]`, the graph will PAUSE before
     executing this node. That means:
-    - The agent can draft an email (`draft_node`) and update the state.
+    - The agent can draft an email (`draft_node` or `fused_node`) and update the state.
     - Execution stops before any further action (such as sending the email).
     - A human must explicitly approve by calling `/approve/{thread_id}` in the
       API layer, which resumes the graph from this interruption point.
     """
-    return state
+    return {}
+
+
+def open_checkpointer() -> AsyncContextManager[AsyncSqliteSaver]:
+    """Open the SQLite checkpointer used to persist and resume graph threads.
+
+    AsyncSqliteSaver persists checkpoints to disk. Each `thread_id` provided
+    via LangGraph's `config` is used to persist and later resume the state,
+    so `/approve/{thread_id}` works across restarts and worker processes
+    without re-running the analyze step. Use as an async context manager for
+    the lifetime of the application so the connection is closed on shutdown.
+    """
+    return AsyncSqliteSaver.from_conn_string(settings.checkpoint_db_path)
 
 
-def build_graph() -> Any:
+def build_graph(checkpointer: BaseCheckpointSaver) -> Any:
     """Build and compile the LangGraph state machine for negotiations."""
     builder = StateGraph(NegotiationState)
 
-    builder.add_node("analyze", analyze_node)
-    builder.add_node("strategy", strategy_node)
-    builder.add_node("draft", draft_node)
+    # LLM-backed nodes are async so that Gemini round-trips yield the
+    # event loop instead of pinning a worker thread; run via `ainvoke`.
     builder.add_node("human_review", human_review_node)
 
-    builder.set_entry_point("analyze")
-    builder.add_edge("analyze", "strategy")
-    builder.add_edge("strategy", "draft")
-    builder.add_edge("draft", "human_review")
-
-    # MemorySaver acts as an in-memory checkpointer. Each `thread_id` provided
-    # via LangGraph's `config` is used to persist and later resume the state.
-    checkpointer = MemorySaver()
+    if settings.graph_mode == "fused":
+        # One LLM call covers analyze + draft on the happy path.
+        builder.add_node("fused", fused_node)
+        builder.set_entry_point("fused")
+        builder.add_edge("fused", "human_review")
+    else:
+        # Staged pipeline, kept for debugging extraction and drafting separately.
+        builder.add_node("analyze", analyze_node)
+        builder.add_node("strategy", strategy_node)
+        builder.add_node("draft", draft_node)
+
+        builder.set_entry_point("analyze")
+        builder.add_edge("analyze", "strategy")
+        builder.add_edge("strategy", "draft")
+        builder.add_edge("draft", "human_review")
 
     # HUMAN-IN-THE-LOOP MECHANISM:
     # ----------------------------
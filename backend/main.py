@@ -1,25 +1,39 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any, Dict, Optional
 from uuid import uuid4
 
 from fastapi import Depends, FastAPI, HTTPException, Path
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from langchain_core.messages import HumanMessage
 from sqlalchemy.exc import NoResultFound
 from sqlmodel import Session, select
 
-from config import get_settings
 from db import get_session, init_db
-from graph import GraphConfig, build_graph
-from models import EmailDirection, NegotiationStatus, NegotiationThread, EmailLog
+from graph import GraphConfig, build_graph, open_checkpointer
+from models import EmailDirection, NegotiationStatus, NegotiationThread, EmailLog, utc_now
 from schemas import EmailPayload, NegotiationState
 
 
-settings = get_settings()
-graph_app = build_graph()
+# Compiled in `lifespan`, once the checkpointer connection is open.
+graph_app: Any = None
 
-app = FastAPI(title="Vendor AI", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Initialise the database and graph checkpointer for the app's lifetime."""
+    global graph_app
+    init_db()
+    async with open_checkpointer() as checkpointer:
+        graph_app = build_graph(checkpointer)
+        yield
+    graph_app = None
+
+
+app = FastAPI(title="Vendor AI", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,12 +44,6 @@ app.add_middleware(
 )
 
 
-@app.on_event("startup")
-def on_startup() -> None:
-    """Initialise database schema on application startup."""
-    init_db()
-
-
 def _build_initial_state(email: EmailPayload, thread_id: str) -> NegotiationState:
     """Construct the initial LangGraph state from an inbound email."""
     user_message = HumanMessage(
@@ -63,30 +71,20 @@ def _build_initial_state(email: EmailPayload, thread_id: str) -> NegotiationStat
     return state
 
 
-def _invoke_graph(
+async def _invoke_graph(
     state: NegotiationState,
     thread_id: str,
 ) -> NegotiationState:
     """Invoke the LangGraph negotiation app until the human-review interrupt."""
     config: GraphConfig = {"configurable": {"thread_id": thread_id}}
-    result = graph_app.invoke(state, config=config)
+    result = await graph_app.ainvoke(state, config=config)
     return result
 
 
-@app.post("/webhook/email")
-def webhook_email(
-    payload: EmailPayload,
-    session: Session = Depends(get_session),
-) -> Dict[str, Any]:
-    """Receive an inbound vendor email and trigger the negotiation agent.
-
-    This endpoint:
-    - Persists a new `NegotiationThread` and inbound `EmailLog`.
-    - Starts a new LangGraph run for a fresh `thread_id`.
-    - Executes until the human-review interrupt is hit.
-    - Returns the draft email and current negotiation status.
-    """
-    thread_id = str(uuid4())
+def _create_negotiation(session: Session, payload: EmailPayload, thread_id: str) -> NegotiationThread:
+    """Persist a new `NegotiationThread` and its inbound `EmailLog`."""
+    # Read the clock once so the thread and its first log share a timestamp.
+    now = utc_now()
 
     negotiation = NegotiationThread(
         thread_id=thread_id,
@@ -97,6 +95,8 @@ def webhook_email(
         status=NegotiationStatus.PENDING_ANALYSIS,
         last_email_subject=payload.subject,
         last_email_body=payload.body_text,
+        created_at=now,
+        updated_at=now,
     )
     session.add(negotiation)
     session.flush()
@@ -106,40 +106,106 @@ def webhook_email(
         direction=EmailDirection.INBOUND,
         subject=payload.subject,
         body=payload.body_text,
+        created_at=now,
     )
     session.add(inbound_log)
     session.commit()
+    return negotiation
 
-    initial_state = _build_initial_state(payload, thread_id)
-    updated_state = _invoke_graph(initial_state, thread_id)
 
-    draft_response = updated_state.get("draft_response")
-    if draft_response is None:
-        raise HTTPException(
-            status_code=500,
-            detail="Draft email was not generated by the negotiation agent.",
-        )
-
-    # Update database with latest extracted metadata for traceability.
+def _record_draft(
+    session: Session,
+    negotiation: NegotiationThread,
+    updated_state: NegotiationState,
+    draft_response: str,
+) -> None:
+    """Store the extracted metadata and draft on the negotiation thread."""
     negotiation.vendor_name = updated_state.get("vendor_name")
     negotiation.product_name = updated_state.get("product_name")
     negotiation.current_offer = updated_state.get("current_offer")
     negotiation.target_price = updated_state.get("target_price")
     negotiation.status = NegotiationStatus.AWAITING_HUMAN_REVIEW
     negotiation.last_email_body = draft_response
+    negotiation.updated_at = utc_now()
+
+    session.add(negotiation)
+    session.commit()
+
+
+def _load_negotiation(session: Session, thread_id: str) -> Optional[NegotiationThread]:
+    """Fetch a negotiation thread by its LangGraph `thread_id`."""
+    try:
+        statement = select(NegotiationThread).where(NegotiationThread.thread_id == thread_id)
+        return session.exec(statement).one_or_none()
+    except NoResultFound:
+        return None
+
+
+def _record_sent(
+    session: Session,
+    negotiation: NegotiationThread,
+    final_response: Optional[str],
+) -> None:
+    """Record the outbound email and mark the negotiation as sent."""
+    sent_at = utc_now()
+    outbound_log = EmailLog(
+        negotiation_thread_id=negotiation.id,  # type: ignore[arg-type]
+        direction=EmailDirection.OUTBOUND,
+        subject=negotiation.last_email_subject or "Negotiation response",
+        body=final_response or "",
+        created_at=sent_at,
+    )
+    session.add(outbound_log)
 
+    negotiation.status = NegotiationStatus.SENT
+    negotiation.updated_at = sent_at
     session.add(negotiation)
     session.commit()
 
+
+# The endpoints are async so graph runs await Gemini without holding a worker
+# thread. SQLModel sessions are synchronous, so every database helper above is
+# pushed to the threadpool with `run_in_threadpool` to keep the loop free.
+
+
+@app.post("/webhook/email")
+async def webhook_email(
+    payload: EmailPayload,
+    session: Session = Depends(get_session),
+) -> Dict[str, Any]:
+    """Receive an inbound vendor email and trigger the negotiation agent.
+
+    This endpoint:
+    - Persists a new `NegotiationThread` and inbound `EmailLog`.
+    - Starts a new LangGraph run for a fresh `thread_id`.
+    - Executes until the human-review interrupt is hit.
+    - Returns the draft email and current negotiation status.
+    """
+    thread_id = str(uuid4())
+    negotiation = await run_in_threadpool(_create_negotiation, session, payload, thread_id)
+
+    initial_state = _build_initial_state(payload, thread_id)
+    updated_state = await _invoke_graph(initial_state, thread_id)
+
+    draft_response = updated_state.get("draft_response")
+    if draft_response is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Draft email was not generated by the negotiation agent.",
+        )
+
+    # Update database with latest extracted metadata for traceability.
+    await run_in_threadpool(_record_draft, session, negotiation, updated_state, draft_response)
+
     return {
         "thread_id": thread_id,
-        "status": negotiation.status.value,
+        "status": NegotiationStatus.AWAITING_HUMAN_REVIEW.value,
         "draft_response": draft_response,
     }
 
 
 @app.post("/approve/{thread_id}")
-def approve_thread(
+async def approve_thread(
     thread_id: str = Path(..., description="LangGraph thread identifier."),
     session: Session = Depends(get_session),
 ) -> Dict[str, Any]:
@@ -153,11 +219,7 @@ def approve_thread(
       is resumed for that `thread_id`. This ensures no email can be "sent"
       by the agent without an explicit human approval call.
     """
-    try:
-        statement = select(NegotiationThread).where(NegotiationThread.thread_id == thread_id)
-        negotiation: Optional[NegotiationThread] = session.exec(statement).one_or_none()
-    except NoResultFound:
-        negotiation = None
+    negotiation = await run_in_threadpool(_load_negotiation, session, thread_id)
 
     if negotiation is None:
         raise HTTPException(status_code=404, detail="Negotiation thread not found.")
@@ -172,27 +234,16 @@ def approve_thread(
     # checkpointer keyed by `thread_id`, providing the config alone is
     # sufficient to continue from where `/webhook/email` left off.
     config: GraphConfig = {"configurable": {"thread_id": thread_id}}
-    resumed_state: NegotiationState = graph_app.invoke(None, config=config)
+    resumed_state: NegotiationState = await graph_app.ainvoke(None, config=config)
 
     final_response = resumed_state.get("draft_response") or negotiation.last_email_body
 
     # For the MVP we mock the "send" operation by recording an outbound EmailLog
     # and updating the negotiation status. No actual email is dispatched here.
-    outbound_log = EmailLog(
-        negotiation_thread_id=negotiation.id,  # type: ignore[arg-type]
-        direction=EmailDirection.OUTBOUND,
-        subject=negotiation.last_email_subject or "Negotiation response",
-        body=final_response or "",
-    )
-    session.add(outbound_log)
-
-    negotiation.status = NegotiationStatus.SENT
-    session.add(negotiation)
-    session.commit()
+    await run_in_threadpool(_record_sent, session, negotiation, final_response)
 
     return {
         "thread_id": thread_id,
-        "status": negotiation.status.value,
+        "status": NegotiationStatus.SENT.value,
         "final_response": final_response,
     }
-
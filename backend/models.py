@@ -1,12 +1,23 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
+def utc_now() -> datetime:
+    """Return the current UTC time as a naive datetime.
+
+    The timestamp columns are declared without a timezone, so we store naive
+    UTC (as `datetime.utcnow` did) rather than aware values that SQLite would
+    silently strip and Postgres would shift into the session time zone.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class NegotiationStatus(str, Enum):
     """Database-level status for a negotiation thread.
 
@@ -33,6 +44,9 @@ class EmailDirection(str, Enum):
 class NegotiationThread(SQLModel, table=True):
     """Persistent representation of a negotiation flow with a vendor."""
 
+    # Serves "threads in status X, oldest first" queue scans with an index seek.
+    __table_args__ = (Index("ix_thread_status_updated", "status", "updated_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
     # LangGraph thread identifier used to resume executions.
@@ -53,11 +67,11 @@ class NegotiationThread(SQLModel, table=True):
     last_email_body: Optional[str] = Field(default=None)
 
     created_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=utc_now,
         sa_column_kwargs={"nullable": False},
     )
     updated_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=utc_now,
         sa_column_kwargs={"nullable": False},
     )
 
@@ -80,7 +94,7 @@ class EmailLog(SQLModel, table=True):
     body: str = Field(sa_column_kwargs={"nullable": False})
 
     created_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=utc_now,
         sa_column_kwargs={"nullable": False},
     )
 
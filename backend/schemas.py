@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Literal, Optional, TypedDict
+from datetime import datetime, timezone
+from typing import Annotated, Literal, Optional, TypedDict
 
 from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
 from pydantic import BaseModel, EmailStr, Field
 
 
@@ -26,7 +27,8 @@ class NegotiationState(TypedDict, total=False):
     is persisted by LangGraph's checkpointer between node executions.
     """
 
-    messages: list[BaseMessage]
+    # `add_messages` appends node-returned messages instead of replacing the list.
+    messages: Annotated[list[BaseMessage], add_messages]
     current_offer: Optional[float]
     target_price: Optional[float]
     status: NegotiationStatusEnum
@@ -40,6 +42,42 @@ class NegotiationState(TypedDict, total=False):
     draft_response: Optional[str]
 
 
+class AnalyzePayload(BaseModel):
+    """Structured fields extracted from a vendor email by the analyze node.
+
+    Passed to Gemini as the structured-output schema so the model returns
+    these fields directly instead of free-form JSON text.
+    """
+
+    vendor_name: Optional[str] = Field(default=None, description="Vendor company name.")
+    product_name: Optional[str] = Field(default=None, description="SaaS product or plan being quoted.")
+    current_offer: Optional[float] = Field(
+        default=None,
+        description="Quoted price per seat per month.",
+    )
+    sender_name: Optional[str] = Field(
+        default=None,
+        description="Human contact at the vendor who sent the email.",
+    )
+    recipient_name: Optional[str] = Field(
+        default=None,
+        description="Our contact name the email is addressed to.",
+    )
+
+
+class FusedPayload(AnalyzePayload):
+    """Analyze fields plus a drafted reply, returned by the fused graph node."""
+
+    decision_hint: Optional[Literal["accept", "reject", "counter"]] = Field(
+        default=None,
+        description="The model's guess at our negotiation decision.",
+    )
+    draft_email: Optional[str] = Field(
+        default=None,
+        description="Reply email body for the guessed decision.",
+    )
+
+
 class EmailPayload(BaseModel):
     """Incoming email webhook payload from an email provider.
 
@@ -60,7 +98,7 @@ class EmailPayload(BaseModel):
     body_text: str = Field(..., description="Plain-text body of the email.")
 
     received_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=lambda: datetime.now(timezone.utc),
         description="Timestamp when the email was received by our system.",
     )
 
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Final, Mapping
 
 
 FAIR_PRICE_SPREAD_RATIO: float = 0.1
@@ -9,8 +12,34 @@ FAIR_PRICE_SPREAD_RATIO: float = 0.1
 COUNTER_OFFER_DISCOUNT_RATIO: float = 0.1
 """Default discount applied when proposing a counter offer."""
 
+_COUNTER_OFFER_MULTIPLIER: Final[float] = 1.0 - COUNTER_OFFER_DISCOUNT_RATIO
 
-@dataclass(frozen=True)
+
+# Basic static catalogue for real SaaS subscriptions (per-seat monthly pricing).
+# These prices are illustrative and not guaranteed to match current vendor pricing.
+_CATALOGUE: Final[Mapping[str, float]] = MappingProxyType(
+    {
+        "salesforce sales cloud": 80.0,
+        "salesforce service cloud": 75.0,
+        "hubspot marketing hub": 60.0,
+        "hubspot sales hub": 50.0,
+        "microsoft 365 business standard": 15.0,
+        "google workspace business standard": 12.0,
+        "jira software standard": 8.0,
+        "asana advanced": 25.0,
+        "slack pro": 8.0,
+        "slack business+": 15.0,
+        "zoom pro": 15.0,
+        "zoom business": 20.0,
+        "zendesk support professional": 49.0,
+        "zendesk support enterprise": 99.0,
+        "datadog infrastructure pro": 23.0,
+        "snowflake standard": 40.0,
+    },
+)
+
+
+@dataclass(frozen=True, slots=True)
 class MarketRate:
     """Represents a simple fair price range for a product."""
 
@@ -20,12 +49,16 @@ class MarketRate:
     reference: float
 
 
+@lru_cache(maxsize=256)
 def lookup_market_rates(product_name: str) -> MarketRate:
     """Return a mock fair market price range for the given product.
 
     In a production system this would query internal pricing data,
     vendor benchmarks, or external pricing APIs. For the MVP we use
     deterministic heuristics so behaviour is predictable and testable.
+
+    Results are cached per product name; `MarketRate` is frozen, so sharing
+    the cached instance between callers is safe.
     """
     base_price = _derive_base_price(product_name)
     spread = base_price * FAIR_PRICE_SPREAD_RATIO
@@ -56,13 +89,14 @@ def calculate_counter_offer(current_price: float, market_rate: float) -> float:
     if market_rate <= 0.0:
         raise ValueError("market_rate must be positive.")
 
-    baseline = min(current_price, market_rate)
-    discounted = baseline * (1.0 - COUNTER_OFFER_DISCOUNT_RATIO)
+    baseline = current_price if current_price < market_rate else market_rate
+    discounted = baseline * _COUNTER_OFFER_MULTIPLIER
 
     # Round to two decimals to mirror currency representation.
     return round(discounted, 2)
 
 
+@lru_cache(maxsize=256)
 def _derive_base_price(product_name: str) -> float:
     """Internal helper to provide a deterministic base price per SaaS product.
 
@@ -71,29 +105,9 @@ def _derive_base_price(product_name: str) -> float:
     """
     normalized_name = product_name.strip().lower()
 
-    # Basic static catalogue for real SaaS subscriptions (per-seat monthly pricing).
-    # These prices are illustrative and not guaranteed to match current vendor pricing.
-    static_catalogue = {
-        "salesforce sales cloud": 80.0,
-        "salesforce service cloud": 75.0,
-        "hubspot marketing hub": 60.0,
-        "hubspot sales hub": 50.0,
-        "microsoft 365 business standard": 15.0,
-        "google workspace business standard": 12.0,
-        "jira software standard": 8.0,
-        "asana advanced": 25.0,
-        "slack pro": 8.0,
-        "slack business+": 15.0,
-        "zoom pro": 15.0,
-        "zoom business": 20.0,
-        "zendesk support professional": 49.0,
-        "zendesk support enterprise": 99.0,
-        "datadog infrastructure pro": 23.0,
-        "snowflake standard": 40.0,
-    }
-
-    if normalized_name in static_catalogue:
-        return static_catalogue[normalized_name]
+    catalogue_price = _CATALOGUE.get(normalized_name)
+    if catalogue_price is not None:
+        return catalogue_price
 
     # Fallback heuristic: length-based pricing to keep it deterministic.
     base_value = max(len(normalized_name), 1)